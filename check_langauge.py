@@ -25,7 +25,12 @@ def check_languages():
     # Load CONCEPT_SYNONYM
     synonym_file = Path(DATA_DIR) / "CONCEPT_SYNONYM_cleaned.csv"
     print(f"\nLoading {synonym_file}...")
-    synonyms_df = pd.read_csv(synonym_file, sep='\t')
+    synonyms_df = pd.read_csv(
+        synonym_file, sep='\t',
+        usecols=['concept_id', 'concept_synonym_name', 'language_concept_id'],
+        dtype={'concept_id': 'int32', 'concept_synonym_name': 'string',
+               'language_concept_id': 'int32'}
+    )
     
     print(f"Total synonym entries: {len(synonyms_df):,}")
     
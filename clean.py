@@ -4,59 +4,129 @@ Clean OMOP CSV files to fix quote issues for Neo4j import
 This script handles tab-delimited CSV files and fixes malformed quotes
 """
 
-import csv
 import os
+import shutil
 import sys
+from multiprocessing import Pool
 from pathlib import Path
 
-def clean_csv_file(input_path, output_path):
+# Large read/write buffers keep the cleaning IO-bound instead of syscall-bound
+BUFFER_SIZE = 1 << 20
+
+
+def clean_line(line):
     """
-    Clean a CSV file by reading it without quote processing and writing it cleanly
+    Clean one tab-delimited line: strip whitespace and surrounding quotes
+    from each field, escape any remaining quotes
     """
-    print(f"Processing: {input_path}")
-    
+    fields = line.rstrip(b'\r\n').split(b'\t')
+    cleaned_row = []
+    for field in fields:
+        # Remove leading/trailing quotes if they exist
+        field = field.strip()
+        if field[:1] == b'"' and field[-1:] == b'"':
+            field = field[1:-1]
+        # Replace any remaining quotes with escaped quotes
+        cleaned_row.append(field.replace(b'"', b'\\"'))
+    return b'\t'.join(cleaned_row) + b'\n'
+
+
+def shard_file(input_path, n_shards):
+    """
+    Split a file into up to n_shards byte ranges, each snapped forward to
+    the next newline so every shard holds whole lines
+    """
+    size = os.path.getsize(input_path)
+    ranges = []
+    start = 0
+    with open(input_path, 'rb') as f:
+        for i in range(1, n_shards):
+            boundary = size * i // n_shards
+            if boundary <= start:
+                continue
+            f.seek(boundary)
+            f.readline()  # skip to the start of the next full line
+            end = min(f.tell(), size)
+            if end > start:
+                ranges.append((start, end))
+                start = end
+    if start < size or not ranges:
+        ranges.append((start, size))
+    return ranges
+
+
+def clean_shard(args):
+    """
+    Worker: clean one byte range of a file into its own shard output file.
+    Returns (lines processed, errors)
+    """
+    input_path, start, end, shard_path = args
+
     line_count = 0
     error_count = 0
-    
+
+    with open(input_path, 'rb', buffering=BUFFER_SIZE) as infile, \
+         open(shard_path, 'wb', buffering=BUFFER_SIZE) as outfile:
+
+        infile.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            line = infile.readline()
+            if not line:
+                break
+            remaining -= len(line)
+            try:
+                outfile.write(clean_line(line))
+                line_count += 1
+            except Exception as e:
+                error_count += 1
+                print(f"  Warning: Error in {shard_path}: {str(e)}")
+
+    return line_count, error_count
+
+
+def clean_csv_file(input_path, output_path, pool=None):
+    """
+    Clean a CSV file by streaming it line by line in binary mode.
+    The file is split into byte-range shards that are cleaned in parallel
+    (shards are independent line-by-line work), then the shard outputs are
+    concatenated in order.
+    """
+    print(f"Processing: {input_path}")
+
     try:
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as infile, \
-             open(output_path, 'w', encoding='utf-8', newline='') as outfile:
-            
-            # Read without any quote processing
-            reader = csv.reader(infile, delimiter='\t', quoting=csv.QUOTE_NONE)
-            writer = csv.writer(outfile, delimiter='\t', quoting=csv.QUOTE_NONE, escapechar='\\')
-            
-            for i, row in enumerate(reader):
-                try:
-                    # Clean each field - remove problematic quotes and extra whitespace
-                    cleaned_row = []
-                    for field in row:
-                        # Remove leading/trailing quotes if they exist
-                        field = field.strip()
-                        if field.startswith('"') and field.endswith('"'):
-                            field = field[1:-1]
-                        # Replace any remaining quotes with escaped quotes
-                        field = field.replace('"', '\\"')
-                        cleaned_row.append(field)
-                    
-                    writer.writerow(cleaned_row)
-                    line_count += 1
-                    
-                    if line_count % 100000 == 0:
-                        print(f"  Processed {line_count:,} lines...")
-                        
-                except Exception as e:
-                    error_count += 1
-                    print(f"  Warning: Error on line {i+1}: {str(e)}")
-                    continue
-        
+        ranges = shard_file(input_path, os.cpu_count() or 1)
+        shards = [
+            (str(input_path), start, end, f"{output_path}.shard{i}")
+            for i, (start, end) in enumerate(ranges)
+        ]
+
+        if pool is not None:
+            results = pool.map(clean_shard, shards)
+        elif len(shards) > 1:
+            with Pool(len(shards)) as own_pool:
+                results = own_pool.map(clean_shard, shards)
+        else:
+            results = [clean_shard(shard) for shard in shards]
+
+        # Concatenate the shard outputs in order
+        with open(output_path, 'wb', buffering=BUFFER_SIZE) as outfile:
+            for _, _, _, shard_path in shards:
+                with open(shard_path, 'rb', buffering=BUFFER_SIZE) as shard_file_obj:
+                    shutil.copyfileobj(shard_file_obj, outfile)
+                os.remove(shard_path)
+
+        line_count = sum(lines for lines, _ in results)
+        error_count = sum(errors for _, errors in results)
+
         print(f"✓ Completed: {line_count:,} lines processed, {error_count} errors")
         return True
-        
+
     except Exception as e:
         print(f"✗ Failed to process {input_path}: {str(e)}")
         return False
 
+
 def main():
     # Get the directory path from command line or use default
     if len(sys.argv) > 1:
@@ -71,18 +141,19 @@ def main():
     files_to_clean = ['CONCEPT.csv', 'CONCEPT_SYNONYM.csv', 'CONCEPT_RELATIONSHIP.csv']
     
     success_count = 0
-    for filename in files_to_clean:
-        input_path = input_dir / filename
-        output_path = input_dir / f"{filename.replace('.csv', '_cleaned.csv')}"
-        
-        if not input_path.exists():
-            print(f"⊘ Skipping {filename} (not found)")
+    with Pool(os.cpu_count() or 1) as pool:
+        for filename in files_to_clean:
+            input_path = input_dir / filename
+            output_path = input_dir / f"{filename.replace('.csv', '_cleaned.csv')}"
+
+            if not input_path.exists():
+                print(f"⊘ Skipping {filename} (not found)")
+                print()
+                continue
+
+            if clean_csv_file(input_path, output_path, pool=pool):
+                success_count += 1
             print()
-            continue
-        
-        if clean_csv_file(input_path, output_path):
-            success_count += 1
-        print()
     
     print("=" * 60)
     print(f"Summary: {success_count}/{len(files_to_clean)} files cleaned successfully")
@@ -4,11 +4,25 @@ Build Neo4j graph - Import ALL concepts with any target language name
 Correct logic: SYNONYM → find concepts → map to SNOMED → create nodes
 """
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import subprocess
 from pathlib import Path
 
+# pyarrow parses CSVs with all cores; fall back to pandas' single-threaded
+# chunked reader when it is not installed
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pyarrow_csv
+except ImportError:
+    pyarrow_csv = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -20,13 +34,30 @@ NEO4J_PASSWORD = "YOUR_NEO4J_PASSWORD_HERE"
 # Data directory
 DATA_DIR = "/Users/dgg32/Documents/claude/vocabulary_download_v5_snomed_pcs_cm_cn_de"
 
+# Offline bulk load: instead of online Cypher writes, dump the graph as CSVs
+# and load them with neo4j-admin (bypasses transactions entirely, ~an order of
+# magnitude faster). The target database must be stopped while it runs.
+USE_BULK_IMPORT = False
+NEO4J_ADMIN = "neo4j-admin"
+NEO4J_DATABASE = "neo4j"
+
 # Domains to exclude (not relevant for medical dictionary)
 EXCLUDED_DOMAINS = ['Geography']  # Add more if needed: ['Geography', 'Type Concept', 'Metadata']
 
 
 class MultilingualNeo4jGraphBuilder:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # Tuned for bulk ingest over local loopback: pool sized for the
+        # threaded writers, no TLS, generous acquisition timeout
+        self.driver = GraphDatabase.driver(
+            uri, auth=(user, password),
+            max_connection_pool_size=64,
+            connection_acquisition_timeout=120,
+            connection_timeout=30,
+            encrypted=False,
+            keep_alive=True,
+        )
+        self._apoc_available = None
     
     def close(self):
         self.driver.close()
@@ -77,101 +108,244 @@ class MultilingualNeo4jGraphBuilder:
                 FOR (n:Name) ON EACH [n.value]
             """)
         logger.info("Indexes created")
-    
-    def batch_create_concepts(self, concepts_df):
-        """Create concept nodes in batches"""
-        logger.info(f"Creating {len(concepts_df)} concept nodes...")
-        
-        batch_size = 1000
-        total_batches = (len(concepts_df) + batch_size - 1) // batch_size
-        
+
+    def await_indexes(self):
+        """Block until all indexes (including the constraint's backing index)
+        are online, then touch the concept_id index so its pages are warm
+        before the write storm starts"""
+        logger.info("Waiting for indexes to come online...")
         with self.driver.session() as session:
-            for i in range(0, len(concepts_df), batch_size):
-                batch = concepts_df.iloc[i:i+batch_size]
-                batch_num = (i // batch_size) + 1
-                
-                concepts = batch.to_dict('records')
-                
-                session.run("""
-                    UNWIND $concepts AS concept
-                    CREATE (c:Concept {
-                        concept_id: concept.concept_id,
-                        concept_code: concept.concept_code,
-                        canonical_name: concept.canonical_name,
-                        domain_id: concept.domain_id,
-                        vocabulary_id: concept.vocabulary_id,
-                        concept_class_id: concept.concept_class_id,
-                        standard_concept: concept.standard_concept
-                    })
-                """, concepts=concepts)
-                
+            session.run("CALL db.awaitIndexes()").consume()
+            session.run("MATCH (c:Concept) WHERE c.concept_id = 0 RETURN c LIMIT 1").consume()
+        logger.info("Indexes online")
+    
+    def has_apoc(self):
+        """Check once whether the APOC plugin is installed on the server"""
+        if self._apoc_available is None:
+            with self.driver.session() as session:
+                try:
+                    session.run("RETURN apoc.version()").consume()
+                    self._apoc_available = True
+                except Exception:
+                    self._apoc_available = False
+                    logger.info("APOC not available - using client-side batching")
+        return self._apoc_available
+
+    def _run_apoc_iterate(self, query, **params):
+        """Run an apoc.periodic.iterate call and fail loudly if any batch
+        failed - the procedure reports inner-statement errors in its YIELD
+        columns instead of raising"""
+        with self.driver.session() as session:
+            record = session.run(query, **params).single()
+        if record['failedBatches'] > 0:
+            raise RuntimeError(
+                f"apoc.periodic.iterate left {record['failedBatches']} failed batches "
+                f"({record['failedOperations']} failed operations): "
+                f"{record['errorMessages']}"
+            )
+
+    def _run_batch(self, query, params, max_retries=5):
+        """Run one batch in its own session, retrying on transient errors
+        (e.g. deadlocks between concurrent relationship batches)"""
+        for attempt in range(max_retries):
+            try:
+                with self.driver.session(fetch_size=10000) as session:
+                    session.execute_write(lambda tx: tx.run(query, params).consume())
+                return
+            except TransientError:
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+
+    def _run_in_batches(self, query, param_name, records, batch_size=1000, max_workers=1):
+        """Fallback writer: run an UNWIND query over client-side batches,
+        optionally spread across a thread pool (the driver is thread-safe
+        with one session per thread)"""
+        batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+        total_batches = len(batches)
+
+        if max_workers <= 1 or total_batches <= 1:
+            for batch_num, batch in enumerate(batches, start=1):
+                self._run_batch(query, {param_name: batch})
                 if batch_num % 10 == 0:
                     logger.info(f"  Processed batch {batch_num}/{total_batches}")
-        
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._run_batch, query, {param_name: batch})
+                       for batch in batches]
+            for batch_num, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if batch_num % 10 == 0:
+                    logger.info(f"  Processed batch {batch_num}/{total_batches}")
+
+    def batch_create_concepts(self, concepts_df):
+        """Create concept nodes in batches"""
+        logger.info(f"Creating {len(concepts_df)} concept nodes...")
+
+        concepts = concepts_df.to_dict('records')
+        create_concept = """
+            CREATE (c:Concept {
+                concept_id: concept.concept_id,
+                concept_code: concept.concept_code,
+                canonical_name: concept.canonical_name,
+                domain_id: concept.domain_id,
+                vocabulary_id: concept.vocabulary_id,
+                concept_class_id: concept.concept_class_id,
+                standard_concept: concept.standard_concept
+            })
+        """
+
+        if self.has_apoc():
+            # Server-side batching; parallel:false so concurrent batches do not
+            # contend on the concept_id uniqueness constraint
+            self._run_apoc_iterate(f"""
+                CALL apoc.periodic.iterate(
+                    "UNWIND $concepts AS concept RETURN concept",
+                    "{create_concept}",
+                    {{batchSize: 10000, parallel: false, params: {{concepts: $concepts}}}}
+                )
+                YIELD failedBatches, failedOperations, errorMessages
+                RETURN failedBatches, failedOperations, errorMessages
+            """, concepts=concepts)
+        else:
+            self._run_in_batches(f"UNWIND $concepts AS concept {create_concept}",
+                                 'concepts', concepts)
+
         logger.info("All concept nodes created")
-    
+
     def batch_create_names(self, names_df):
         """Create Name nodes and connect to Concepts"""
         logger.info(f"Creating {len(names_df)} name nodes and HAS_NAME relationships...")
-        
-        batch_size = 1000
-        total_batches = (len(names_df) + batch_size - 1) // batch_size
-        
-        with self.driver.session() as session:
-            for i in range(0, len(names_df), batch_size):
-                batch = names_df.iloc[i:i+batch_size]
-                batch_num = (i // batch_size) + 1
-                
-                names = batch.to_dict('records')
-                
-                session.run("""
-                    UNWIND $names AS name
-                    MATCH (c:Concept {concept_id: name.concept_id})
-                    CREATE (n:Name {
-                        concept_id: name.concept_id,
-                        value: name.value,
-                        language_concept_id: name.language_concept_id,
-                        language_name: name.language_name
-                    })
-                    CREATE (c)-[:HAS_NAME]->(n)
-                """, names=names)
-                
-                if batch_num % 10 == 0:
-                    logger.info(f"  Processed batch {batch_num}/{total_batches}")
-        
+
+        # language_name is redundant with language_concept_id - resolve it at
+        # query time via language_id.csv instead of storing it on every node
+        names = names_df.drop(columns=['language_name']).to_dict('records')
+        create_name = """
+            MATCH (c:Concept)
+            USING INDEX c:Concept(concept_id)
+            WHERE c.concept_id = name.concept_id
+            CREATE (n:Name {
+                concept_id: name.concept_id,
+                value: name.value,
+                language_concept_id: name.language_concept_id
+            })
+            CREATE (c)-[:HAS_NAME]->(n)
+        """
+
+        if self.has_apoc():
+            self._run_apoc_iterate(f"""
+                CALL apoc.periodic.iterate(
+                    "UNWIND $names AS name RETURN name",
+                    "{create_name}",
+                    {{batchSize: 10000, parallel: true, concurrency: 16, retries: 3,
+                      params: {{names: $names}}}}
+                )
+                YIELD failedBatches, failedOperations, errorMessages
+                RETURN failedBatches, failedOperations, errorMessages
+            """, names=names)
+        else:
+            self._run_in_batches(f"UNWIND $names AS name {create_name}",
+                                 'names', names, max_workers=16)
+
         logger.info("All name nodes and relationships created")
-    
+
     def batch_create_relationships(self, relationships_df, relationship_type):
         """Create relationships in batches"""
         if len(relationships_df) == 0:
             logger.info(f"No {relationship_type} relationships to create")
             return
-        
+
         logger.info(f"Creating {len(relationships_df)} {relationship_type} relationships...")
-        
-        batch_size = 1000
-        total_batches = (len(relationships_df) + batch_size - 1) // batch_size
-        
-        with self.driver.session() as session:
-            for i in range(0, len(relationships_df), batch_size):
-                batch = relationships_df.iloc[i:i+batch_size]
-                batch_num = (i // batch_size) + 1
-                
-                relationships = batch.to_dict('records')
-                
-                session.run(f"""
-                    UNWIND $relationships AS rel
-                    MATCH (source:Concept {{concept_id: rel.concept_id_1}})
-                    MATCH (target:Concept {{concept_id: rel.concept_id_2}})
-                    CREATE (source)-[:{relationship_type}]->(target)
-                """, relationships=relationships)
-                
-                if batch_num % 10 == 0:
-                    logger.info(f"  Processed batch {batch_num}/{total_batches}")
-        
+
+        # Ship only the two endpoint ids per relationship - one round trip,
+        # batched server-side
+        pairs = relationships_df.rename(
+            columns={'concept_id_1': 's', 'concept_id_2': 't'}).to_dict('records')
+        create_rel = f"""
+            MATCH (source:Concept)
+            USING INDEX source:Concept(concept_id)
+            WHERE source.concept_id = rel.s
+            MATCH (target:Concept)
+            USING INDEX target:Concept(concept_id)
+            WHERE target.concept_id = rel.t
+            CREATE (source)-[:{relationship_type}]->(target)
+        """
+
+        if self.has_apoc():
+            self._run_apoc_iterate(f"""
+                CALL apoc.periodic.iterate(
+                    "UNWIND $pairs AS rel RETURN rel",
+                    "{create_rel}",
+                    {{batchSize: 5000, parallel: true, concurrency: 16, retries: 3,
+                      iterateList: true, params: {{pairs: $pairs}}}}
+                )
+                YIELD failedBatches, failedOperations, errorMessages
+                RETURN failedBatches, failedOperations, errorMessages
+            """, pairs=pairs)
+        else:
+            self._run_in_batches(f"UNWIND $pairs AS rel {create_rel}",
+                                 'pairs', pairs, max_workers=16)
+
         logger.info(f"All {relationship_type} relationships created")
 
 
+def export_bulk_import_csvs(final_concepts, names_df, is_a_rels, maps_to_rels, import_dir):
+    """Write node and relationship CSVs in the neo4j-admin import header format"""
+    import_dir = Path(import_dir)
+    import_dir.mkdir(parents=True, exist_ok=True)
+
+    concepts = final_concepts[['concept_id', 'concept_code', 'canonical_name', 'domain_id',
+                               'vocabulary_id', 'concept_class_id', 'standard_concept']].copy()
+    concepts.columns = ['concept_id:ID(Concept){id-type:int}', 'concept_code', 'canonical_name',
+                        'domain_id', 'vocabulary_id', 'concept_class_id', 'standard_concept']
+    concepts[':LABEL'] = 'Concept'
+    concepts.to_csv(import_dir / 'concepts.csv', index=False)
+
+    names = pd.DataFrame({
+        'name_id:ID(Name)': range(len(names_df)),
+        'concept_id:int': names_df['concept_id'].to_numpy(),
+        'value': names_df['value'].to_numpy(),
+        'language_concept_id:int': names_df['language_concept_id'].to_numpy(),
+    })
+    names[':LABEL'] = 'Name'
+    names.to_csv(import_dir / 'names.csv', index=False)
+
+    has_name = pd.DataFrame({
+        ':START_ID(Concept)': names_df['concept_id'].to_numpy(),
+        ':END_ID(Name)': range(len(names_df)),
+    })
+    has_name[':TYPE'] = 'HAS_NAME'
+    has_name.to_csv(import_dir / 'has_name.csv', index=False)
+
+    for rels, rel_type, filename in [(is_a_rels, 'IS_A', 'is_a.csv'),
+                                     (maps_to_rels, 'MAPS_TO', 'maps_to.csv')]:
+        frame = pd.DataFrame({
+            ':START_ID(Concept)': rels['concept_id_1'].to_numpy(),
+            ':END_ID(Concept)': rels['concept_id_2'].to_numpy(),
+        })
+        frame[':TYPE'] = rel_type
+        frame.to_csv(import_dir / filename, index=False)
+
+    logger.info(f"Bulk import CSVs written to {import_dir}")
+
+
+def run_bulk_import(import_dir):
+    """Load the exported CSVs with the offline neo4j-admin bulk importer"""
+    import_dir = Path(import_dir)
+    cmd = [
+        NEO4J_ADMIN, 'database', 'import', 'full', NEO4J_DATABASE,
+        '--overwrite-destination',
+        f'--nodes={import_dir / "concepts.csv"}',
+        f'--nodes={import_dir / "names.csv"}',
+        f'--relationships={import_dir / "is_a.csv"}',
+        f'--relationships={import_dir / "maps_to.csv"}',
+        f'--relationships={import_dir / "has_name.csv"}',
+    ]
+    logger.info(f"Running: {' '.join(cmd)}")
+    subprocess.run(cmd, check=True)
+
+
 def load_languages(data_dir):
     """Load language mapping from language_id.csv"""
     logger.info("Step 1: Loading language mappings...")
@@ -186,6 +360,50 @@ def load_languages(data_dir):
     return language_map
 
 
+def read_tsv(path, columns, dtypes, row_filter=None):
+    """
+    Read selected columns of a big TSV, optionally keeping only the rows
+    where row_filter (DataFrame -> boolean mask) holds.
+    Uses pyarrow's multi-core reader when available, otherwise pandas
+    chunked reads. Returns (DataFrame, total row count before filtering).
+    """
+    if pyarrow_csv is not None:
+        # Pin string columns at parse time - all-numeric codes like the
+        # ICD-10-PCS '0016070' would otherwise be inferred as int and lose
+        # their leading zeros
+        column_types = {col: pa.string() for col, dtype in dtypes.items()
+                        if dtype == 'string'}
+        table = pyarrow_csv.read_csv(
+            str(path),
+            parse_options=pyarrow_csv.ParseOptions(delimiter='\t'),
+            convert_options=pyarrow_csv.ConvertOptions(include_columns=columns,
+                                                       column_types=column_types),
+        )
+        df = table.to_pandas().astype(dtypes)
+        total = len(df)
+        if row_filter is not None:
+            df = df[row_filter(df)].reset_index(drop=True)
+        return df, total
+
+    total = 0
+    parts = []
+    for chunk in pd.read_csv(path, sep='\t', chunksize=500_000,
+                             usecols=columns, dtype=dtypes):
+        total += len(chunk)
+        parts.append(chunk if row_filter is None else chunk[row_filter(chunk)])
+    # astype re-unifies category columns whose chunks saw different categories
+    return pd.concat(parts, ignore_index=True).astype(dtypes), total
+
+
+def excel_chinese_map(df, code_col, chinese_col):
+    """Build a code -> Chinese name dict from an Excel sheet, fully vectorized"""
+    sub = df[[code_col, chinese_col]].dropna()
+    codes = sub[code_col].astype(str).str.strip()
+    names = sub[chinese_col].astype(str).str.strip()
+    mask = (codes != '') & (codes != 'nan') & (names != '') & (names != 'nan')
+    return dict(zip(codes[mask].tolist(), names[mask].tolist()))
+
+
 def build_graph(data_dir):
     """Main function to build the graph with correct logic"""
     
@@ -203,18 +421,25 @@ def build_graph(data_dir):
     
     # Step 2: Load CONCEPT_SYNONYM and find ALL concepts with target languages
     logger.info("Step 2: Loading CONCEPT_SYNONYM and finding concepts with target languages...")
-    synonyms_df = pd.read_csv(synonym_file, sep='\t')
-    
-    logger.info(f"Total synonym entries: {len(synonyms_df):,}")
-    
-    # Filter for target languages
-    target_synonyms = synonyms_df[synonyms_df['language_concept_id'].isin(target_language_ids)].copy()
+
+    # Only target-language rows are kept. The chunked fallback bounds peak
+    # memory by one chunk plus the filtered output; the pyarrow path parses
+    # the full table first and drops the other rows right after
+    target_synonyms, total_synonyms = read_tsv(
+        synonym_file,
+        columns=['concept_id', 'concept_synonym_name', 'language_concept_id'],
+        dtypes={'concept_id': 'int32', 'concept_synonym_name': 'string',
+                'language_concept_id': 'int32'},
+        row_filter=lambda df: df['language_concept_id'].isin(target_language_ids)
+    )
+
+    logger.info(f"Total synonym entries: {total_synonyms:,}")
     
     logger.info(f"Synonym entries in target languages: {len(target_synonyms):,}")
     logger.info("Distribution by language:")
+    lang_counts = target_synonyms['language_concept_id'].value_counts()
     for lang_id, lang_name in language_map.items():
-        count = len(target_synonyms[target_synonyms['language_concept_id'] == lang_id])
-        logger.info(f"  {lang_name} ({lang_id}): {count:,}")
+        logger.info(f"  {lang_name} ({lang_id}): {lang_counts.get(lang_id, 0):,}")
     
     # Get all concept IDs that have names in target languages
     concepts_with_translations = set(target_synonyms['concept_id'].unique())
@@ -231,14 +456,8 @@ def build_graph(data_dir):
     code_col = [c for c in icd10cm_df.columns if 'ICD' in str(c) and 'CM' in str(c)][0]
     chinese_col = [c for c in icd10cm_df.columns if '中文' in str(c) and 'CM' in str(c).upper()][0]
     
-    icd10cm_chinese = {}
-    for _, row in icd10cm_df.iterrows():
-        code = str(row[code_col]).strip() if pd.notna(row[code_col]) else ''
-        if code and code != 'nan' and pd.notna(row[chinese_col]):
-            chinese_name = str(row[chinese_col]).strip()
-            if chinese_name and chinese_name != 'nan':
-                icd10cm_chinese[code] = chinese_name
-    
+    icd10cm_chinese = excel_chinese_map(icd10cm_df, code_col, chinese_col)
+
     logger.info(f"ICD-10-CM codes with Chinese: {len(icd10cm_chinese)}")
     
     # Read ICD-10-PCS
@@ -248,19 +467,20 @@ def build_graph(data_dir):
     code_col = [c for c in icd10pcs_df.columns if 'ICD' in str(c) and 'PCS' in str(c)][0]
     chinese_col = [c for c in icd10pcs_df.columns if '中文' in str(c) and 'PCS' in str(c).upper()][0]
     
-    icd10pcs_chinese = {}
-    for _, row in icd10pcs_df.iterrows():
-        code = str(row[code_col]).strip() if pd.notna(row[code_col]) else ''
-        if code and code != 'nan' and pd.notna(row[chinese_col]):
-            chinese_name = str(row[chinese_col]).strip()
-            if chinese_name and chinese_name != 'nan':
-                icd10pcs_chinese[code] = chinese_name
-    
+    icd10pcs_chinese = excel_chinese_map(icd10pcs_df, code_col, chinese_col)
+
     logger.info(f"ICD-10-PCS codes with Chinese: {len(icd10pcs_chinese)}")
     
     # Step 4: Load all concepts
     logger.info("Step 4: Loading CONCEPT file...")
-    concepts_df = pd.read_csv(concept_file, sep='\t', dtype={'concept_code': str})
+    concepts_df, _ = read_tsv(
+        concept_file,
+        columns=['concept_id', 'concept_name', 'domain_id', 'vocabulary_id',
+                 'concept_class_id', 'standard_concept', 'concept_code'],
+        dtypes={'concept_id': 'int32', 'concept_name': 'string', 'domain_id': 'category',
+                'vocabulary_id': 'category', 'concept_class_id': 'category',
+                'standard_concept': 'string', 'concept_code': 'string'}
+    )
     concepts_df['standard_concept'] = concepts_df['standard_concept'].fillna('')
     
     logger.info(f"Total concepts in CONCEPT file: {len(concepts_df):,}")
@@ -275,13 +495,30 @@ def build_graph(data_dir):
     
     # Step 6: Load relationships to find related concepts
     logger.info("Step 6: Loading relationships to find additional concepts...")
-    relationships_df = pd.read_csv(relationship_file, sep='\t')
-    
-    # Find all MAPS_TO and IS_A relationships involving our concepts
+
+    # Only 'Maps to' and 'Is a' rows are ever used, so drop everything else
+    # at read time instead of materializing the full relationship table
+    relationships_df, _ = read_tsv(
+        relationship_file,
+        columns=['concept_id_1', 'concept_id_2', 'relationship_id'],
+        dtypes={'concept_id_1': 'int32', 'concept_id_2': 'int32',
+                'relationship_id': 'category'},
+        row_filter=lambda df: df['relationship_id'].isin(['Maps to', 'Is a'])
+    )
+
+    # Classify every relationship once; the masks are reused by the
+    # hierarchy build (Step 6b) and the final filters (Step 9)
+    mask_is_a = relationships_df['relationship_id'].eq('Is a')
+    mask_maps_to = relationships_df['relationship_id'].eq('Maps to')
+
+    # Find all MAPS_TO and IS_A relationships involving our concepts.
+    # A pd.Index gives isin a C-level hash table instead of hashing Python
+    # set members per row
+    seed_index = pd.Index(sorted(concepts_to_import), dtype='int32')
     related_rels = relationships_df[
-        (relationships_df['relationship_id'].isin(['Maps to', 'Is a'])) &
-        ((relationships_df['concept_id_1'].isin(concepts_to_import)) |
-         (relationships_df['concept_id_2'].isin(concepts_to_import)))
+        (mask_is_a | mask_maps_to) &
+        (relationships_df['concept_id_1'].isin(seed_index) |
+         relationships_df['concept_id_2'].isin(seed_index))
     ].copy()
     
     # Add all concepts in these relationships (one hop)
@@ -293,73 +530,51 @@ def build_graph(data_dir):
     # Step 6b: Recursively traverse IS_A hierarchy to get complete chains
     logger.info("Step 6b: Traversing complete IS_A hierarchy...")
     
-    # Get all IS_A relationships
-    is_a_rels = relationships_df[relationships_df['relationship_id'] == 'Is a'].copy()
+    # Get all IS_A relationships (mask computed once in Step 6)
+    all_is_a = relationships_df.loc[mask_is_a, ['concept_id_1', 'concept_id_2']]
     
-    # Build lookup dictionaries for faster traversal
-    # parents[concept_id] = set of parent concept_ids
-    parents = {}
-    # children[concept_id] = set of child concept_ids
-    children = {}
-    
-    for _, row in is_a_rels.iterrows():
-        child_id = row['concept_id_1']
-        parent_id = row['concept_id_2']
-        
-        if child_id not in parents:
-            parents[child_id] = set()
-        parents[child_id].add(parent_id)
-        
-        if parent_id not in children:
-            children[parent_id] = set()
-        children[parent_id].add(child_id)
-    
-    # Function to get all ancestors (recursive traversal up)
-    def get_all_ancestors(concept_id, visited=None):
-        if visited is None:
-            visited = set()
-        
-        if concept_id in visited:
-            return visited
-        
-        visited.add(concept_id)
-        
-        if concept_id in parents:
-            for parent_id in parents[concept_id]:
-                get_all_ancestors(parent_id, visited)
-        
-        return visited
-    
-    # Function to get all descendants (recursive traversal down)
-    def get_all_descendants(concept_id, visited=None):
-        if visited is None:
-            visited = set()
-        
-        if concept_id in visited:
-            return visited
-        
-        visited.add(concept_id)
-        
-        if concept_id in children:
-            for child_id in children[concept_id]:
-                get_all_descendants(child_id, visited)
-        
-        return visited
-    
-    # Collect all concepts in the complete hierarchy
-    all_hierarchy_concepts = set()
-    
-    # For each concept with translations, get complete ancestor and descendant chains
+    # Build a sparse boolean adjacency matrix over the IS_A DAG so the
+    # ancestor/descendant closure runs as compiled matrix-vector products
+    # instead of Python set traversal
+    child_ids = all_is_a['concept_id_1'].to_numpy()
+    parent_ids = all_is_a['concept_id_2'].to_numpy()
+
+    # Map concept_ids to dense matrix indices
+    edge_idx, hierarchy_concepts = pd.factorize(np.concatenate([child_ids, parent_ids]))
+    n_edges = len(child_ids)
+    n_nodes = len(hierarchy_concepts)
+    child_idx = edge_idx[:n_edges]
+    parent_idx = edge_idx[n_edges:]
+
+    # adjacency[child, parent] = True
+    adjacency = sparse.csr_matrix(
+        (np.ones(n_edges, dtype=bool), (child_idx, parent_idx)),
+        shape=(n_nodes, n_nodes), dtype=bool
+    )
+
+    # Function to get everything reachable from a seed vector by repeatedly
+    # propagating the frontier through the adjacency matrix
+    def reachable(seed_idx, matrix):
+        visited = np.zeros(n_nodes, dtype=bool)
+        visited[seed_idx] = True
+        while True:
+            expanded = matrix.dot(visited) | visited
+            if expanded.sum() == visited.sum():
+                return visited
+            visited = expanded
+
+    # For the concepts with translations, get complete ancestor and descendant
+    # chains in one closure per direction instead of one traversal per concept
     starting_concepts = concepts_to_import | additional_concepts
-    
-    for concept_id in starting_concepts:
-        # Get all ancestors (parents, grandparents, etc.)
-        ancestors = get_all_ancestors(concept_id)
-        all_hierarchy_concepts.update(ancestors)
-        
-        # Get all descendants (children, grandchildren, etc.)
-        descendants = get_all_descendants(concept_id)
-        all_hierarchy_concepts.update(descendants)
+
+    seed_idx = pd.Index(hierarchy_concepts).get_indexer(list(starting_concepts))
+    seed_idx = seed_idx[seed_idx >= 0]  # seeds outside the IS_A hierarchy have no chains
+
+    # adjacency.T walks child -> parent (ancestors), adjacency walks parent -> child
+    ancestor_mask = reachable(seed_idx, adjacency.T.tocsr())
+    descendant_mask = reachable(seed_idx, adjacency)
+
+    all_hierarchy_concepts = set(hierarchy_concepts[ancestor_mask | descendant_mask])
     
     # Remove the starting concepts (we already have them)
     hierarchy_only_concepts = all_hierarchy_concepts - starting_concepts
@@ -373,7 +588,8 @@ def build_graph(data_dir):
     
     # Step 7: Filter CONCEPT dataframe
     logger.info("Step 7: Filtering CONCEPT data...")
-    final_concepts = concepts_df[concepts_df['concept_id'].isin(all_concept_ids)].copy()
+    all_concept_index = pd.Index(sorted(all_concept_ids), dtype='int32')
+    final_concepts = concepts_df[concepts_df['concept_id'].isin(all_concept_index)].copy()
     final_concepts['canonical_name'] = final_concepts['concept_name']
     
     # Remove duplicates
@@ -383,9 +599,9 @@ def build_graph(data_dir):
     excluded_concepts = final_concepts[final_concepts['domain_id'].isin(EXCLUDED_DOMAINS)]
     logger.info(f"Filtering out {len(excluded_concepts)} concepts from excluded domains: {EXCLUDED_DOMAINS}")
     
+    excluded_counts = excluded_concepts['domain_id'].value_counts()
     for domain in EXCLUDED_DOMAINS:
-        count = len(excluded_concepts[excluded_concepts['domain_id'] == domain])
-        logger.info(f"  {domain}: {count:,} concepts")
+        logger.info(f"  {domain}: {excluded_counts.get(domain, 0):,} concepts")
     
     final_concepts = final_concepts[~final_concepts['domain_id'].isin(EXCLUDED_DOMAINS)].copy()
     
@@ -395,101 +611,99 @@ def build_graph(data_dir):
     
     logger.info(f"Final concept count after Geography filter: {len(final_concepts)}")
     logger.info("By vocabulary:")
-    for vocab in final_concepts['vocabulary_id'].unique():
-        count = len(final_concepts[final_concepts['vocabulary_id'] == vocab])
-        logger.info(f"  {vocab}: {count:,}")
+    for vocab, count in final_concepts['vocabulary_id'].value_counts().items():
+        if count > 0:  # category dtype also reports the filtered-out vocabularies
+            logger.info(f"  {vocab}: {count:,}")
     
     logger.info("By domain:")
-    for domain in final_concepts['domain_id'].value_counts().head(10).items():
-        logger.info(f"  {domain[0]}: {domain[1]:,}")
+    domain_counts = final_concepts['domain_id'].value_counts()
+    for domain, count in domain_counts[domain_counts > 0].head(10).items():
+        logger.info(f"  {domain}: {count:,}")
     
     # Step 8: Build Name nodes
     logger.info("Step 8: Building Name nodes...")
-    names_list = []
-    
+
     # Get Chinese language ID
     chinese_lang_id = [lid for lid, lname in language_map.items() if lname == 'Chinese'][0]
     
-    # Add Chinese names from Excel for ICD-10
-    for _, concept in final_concepts.iterrows():
-        if concept['vocabulary_id'] == 'ICD10CM' and concept['concept_code'] in icd10cm_chinese:
-            names_list.append({
-                'concept_id': concept['concept_id'],
-                'value': icd10cm_chinese[concept['concept_code']],
-                'language_concept_id': chinese_lang_id,
-                'language_name': 'Chinese'
-            })
-        elif concept['vocabulary_id'] == 'ICD10PCS' and concept['concept_code'] in icd10pcs_chinese:
-            names_list.append({
-                'concept_id': concept['concept_id'],
-                'value': icd10pcs_chinese[concept['concept_code']],
-                'language_concept_id': chinese_lang_id,
-                'language_name': 'Chinese'
-            })
-    
-    logger.info(f"Added {len(names_list)} Chinese names from Excel")
-    
-    # Add names from CONCEPT_SYNONYM for ALL target languages
-    excel_chinese_concepts = set([n['concept_id'] for n in names_list])
-    
-    excluded_skipped = 0
-    
-    for _, row in target_synonyms.iterrows():
-        concept_id = row['concept_id']
-        
-        # Skip if concept not in our final set (after domain filters)
-        if concept_id not in all_concept_ids:
-            if concept_id in excluded_concept_ids:
-                excluded_skipped += 1
-            continue
-        
-        lang_id = row['language_concept_id']
-        lang_name = language_map[lang_id]
-        synonym_value = row['concept_synonym_name']
-        
-        # For Chinese: skip ICD-10 concepts (we use Excel), but include SNOMED
-        if lang_name == 'Chinese':
-            concept_vocab = final_concepts[final_concepts['concept_id'] == concept_id]['vocabulary_id'].iloc[0] if len(final_concepts[final_concepts['concept_id'] == concept_id]) > 0 else None
-            if concept_vocab in ['ICD10CM', 'ICD10PCS']:
-                continue  # Skip, we have it from Excel
-        
-        names_list.append({
-            'concept_id': concept_id,
-            'value': synonym_value,
-            'language_concept_id': lang_id,
-            'language_name': lang_name
-        })
-    
+    # Add Chinese names from Excel for ICD-10 with one vectorized join
+    # on (vocabulary_id, concept_code) instead of a per-concept loop
+    excel_chinese_df = pd.concat([
+        pd.DataFrame({'concept_code': list(icd10cm_chinese.keys()),
+                      'value': list(icd10cm_chinese.values()),
+                      'vocabulary_id': 'ICD10CM'}),
+        pd.DataFrame({'concept_code': list(icd10pcs_chinese.keys()),
+                      'value': list(icd10pcs_chinese.values()),
+                      'vocabulary_id': 'ICD10PCS'}),
+    ], ignore_index=True)
+
+    excel_names = final_concepts[['concept_id', 'concept_code', 'vocabulary_id']].merge(
+        excel_chinese_df, on=['vocabulary_id', 'concept_code'], how='inner'
+    )
+    excel_names['language_concept_id'] = chinese_lang_id
+    excel_names['language_name'] = 'Chinese'
+
+    excel_names_df = excel_names[['concept_id', 'value', 'language_concept_id', 'language_name']]
+
+    logger.info(f"Added {len(excel_names_df)} Chinese names from Excel")
+
+    # Add names from CONCEPT_SYNONYM for ALL target languages, all vectorized
+    # instead of appending per-row dicts
+
+    # O(1) vocabulary lookup for the Chinese-ICD exclusion below
+    vocab_by_id = dict(zip(final_concepts['concept_id'].to_numpy(),
+                           final_concepts['vocabulary_id'].to_numpy()))
+
+    # Keep only synonyms whose concept survived the domain filters
+    excluded_index = pd.Index(sorted(excluded_concept_ids), dtype='int32')
+    surviving_index = pd.Index(sorted(all_concept_ids), dtype='int32')
+    excluded_skipped = int(target_synonyms['concept_id'].isin(excluded_index).sum())
+    syn_names = target_synonyms[target_synonyms['concept_id'].isin(surviving_index)].copy()
+
+    syn_names['language_name'] = syn_names['language_concept_id'].map(language_map)
+    syn_names['vocabulary_id'] = syn_names['concept_id'].map(vocab_by_id)
+
+    # For Chinese: skip ICD-10 concepts (we use Excel), but include SNOMED
+    chinese_icd = ((syn_names['language_name'] == 'Chinese') &
+                   syn_names['vocabulary_id'].isin(['ICD10CM', 'ICD10PCS']))
+    syn_names = syn_names[~chinese_icd].rename(columns={'concept_synonym_name': 'value'})
+
     logger.info(f"Skipped {excluded_skipped:,} name entries for excluded domain concepts")
-    logger.info(f"Total names before deduplication: {len(names_list):,}")
-    
-    # Create DataFrame and remove duplicates
-    names_df = pd.DataFrame(names_list)
+
+    # Combine Excel and synonym names and remove duplicates
+    names_df = pd.concat(
+        [excel_names_df,
+         syn_names[['concept_id', 'value', 'language_concept_id', 'language_name']]],
+        ignore_index=True
+    )
+
+    logger.info(f"Total names before deduplication: {len(names_df):,}")
+
     names_df = names_df.drop_duplicates(subset=['concept_id', 'language_concept_id', 'value'])
     
     logger.info(f"Final names after deduplication: {len(names_df):,}")
     logger.info("Name distribution by language:")
-    for lang_name in sorted(names_df['language_name'].unique()):
-        count = len(names_df[names_df['language_name'] == lang_name])
+    for lang_name, count in names_df['language_name'].value_counts().sort_index().items():
         logger.info(f"  {lang_name}: {count:,}")
     
     # Step 9: Filter relationships
     logger.info("Step 9: Filtering relationships...")
     
-    final_concept_ids = set(final_concepts['concept_id'].tolist())
+    final_concept_index = pd.Index(final_concepts['concept_id'].to_numpy())
+    
+    # Both endpoints must survive the domain filters; computed once and
+    # shared between the IS_A and MAPS_TO filters
+    both_in_final = (relationships_df['concept_id_1'].isin(final_concept_index) &
+                     relationships_df['concept_id_2'].isin(final_concept_index))
     
     # IS_A relationships
     is_a_rels = relationships_df[
-        (relationships_df['relationship_id'] == 'Is a') &
-        (relationships_df['concept_id_1'].isin(final_concept_ids)) &
-        (relationships_df['concept_id_2'].isin(final_concept_ids))
+        mask_is_a & both_in_final
     ][['concept_id_1', 'concept_id_2']].copy()
     
     # MAPS_TO relationships (no self-maps)
     maps_to_rels = relationships_df[
-        (relationships_df['relationship_id'] == 'Maps to') &
-        (relationships_df['concept_id_1'].isin(final_concept_ids)) &
-        (relationships_df['concept_id_2'].isin(final_concept_ids)) &
+        mask_maps_to & both_in_final &
         (relationships_df['concept_id_1'] != relationships_df['concept_id_2'])
     ][['concept_id_1', 'concept_id_2']].copy()
     
@@ -497,6 +711,15 @@ def build_graph(data_dir):
     logger.info(f"MAPS_TO relationships: {len(maps_to_rels):,}")
     
     # Step 10: Build Neo4j graph
+    if USE_BULK_IMPORT:
+        logger.info("Step 10: Building Neo4j graph with neo4j-admin bulk import...")
+        import_dir = data_path / "neo4j_bulk_import"
+        export_bulk_import_csvs(final_concepts, names_df, is_a_rels, maps_to_rels, import_dir)
+        run_bulk_import(import_dir)
+        logger.info("Bulk import finished - start the database and re-create the")
+        logger.info("constraints/indexes (see create_constraints/create_indexes)")
+        return
+
     logger.info("Step 10: Building Neo4j graph...")
     
     builder = MultilingualNeo4jGraphBuilder(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
@@ -505,6 +728,7 @@ def build_graph(data_dir):
         builder.clear_database()
         builder.create_constraints()
         builder.create_indexes()
+        builder.await_indexes()
         builder.batch_create_concepts(final_concepts)
         builder.batch_create_names(names_df)
         builder.batch_create_relationships(is_a_rels, "IS_A")